@@ -2,29 +2,56 @@
 import streamlit as st
 import sqlite3
 import bcrypt
+import os
+import time
+import random
+import secrets
 from typing import Optional, List, Tuple
 
-DB = "sistema_os.db"
+DB = os.environ.get("SISTEMA_OS_DB", "sistema_os.db")
+
+# Vários processos (workers) podem usar o mesmo arquivo: WAL permite leituras
+# concorrentes com uma escrita. Cada tentativa espera o lock por pouco tempo e
+# o backoff em safe_execute faz o resto (pior caso ~5 s por comando).
+BUSY_TIMEOUT = 1.0  # segundos, por tentativa
+WRITE_RETRIES = 3
+RETRY_BASE_DELAY = 0.05
 
 # ---------------------------
 # Helpers DB
 # ---------------------------
 def get_conn():
-    return sqlite3.connect(DB, check_same_thread=False)
+    conn = sqlite3.connect(DB, check_same_thread=False, timeout=BUSY_TIMEOUT)
+    conn.execute("PRAGMA synchronous = NORMAL")
+    return conn
+
+def _is_locked_error(e: sqlite3.OperationalError) -> bool:
+    msg = str(e).lower()
+    return "locked" in msg or "busy" in msg
 
 def safe_execute(query: str, params: tuple = ()):
-    conn = get_conn()
-    cur = conn.cursor()
-    try:
-        cur.execute(query, params)
-        conn.commit()
-        result = cur.fetchall()
-    except Exception as e:
-        conn.rollback()
+    # Repete a operação com backoff exponencial (com jitter) se outro
+    # processo estiver segurando o lock de escrita além do busy_timeout.
+    for tentativa in range(WRITE_RETRIES + 1):
+        conn = get_conn()
+        cur = conn.cursor()
+        try:
+            cur.execute(query, params)
+            result = cur.fetchall()
+            conn.commit()
+        except sqlite3.OperationalError as e:
+            conn.rollback()
+            conn.close()
+            if not _is_locked_error(e) or tentativa == WRITE_RETRIES:
+                raise e
+            time.sleep(RETRY_BASE_DELAY * (2 ** tentativa) * (1 + random.random()))
+            continue
+        except Exception as e:
+            conn.rollback()
+            conn.close()
+            raise e
         conn.close()
-        raise e
-    conn.close()
-    return result
+        return result
 
 # ---------------------------
 # Inicializa DB (cria tabelas e ADMIN se necessário)
@@ -33,6 +60,10 @@ def init_db():
     conn = get_conn()
     c = conn.cursor()
 
+    # journal_mode=WAL fica gravado no arquivo; main() chama init_db uma vez
+    # por processo (init_db_once), não a cada rerun
+    c.execute("PRAGMA journal_mode = WAL")
+
     c.execute("""
     CREATE TABLE IF NOT EXISTS usuarios (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -76,6 +107,17 @@ def init_db():
     )
     """)
 
+    # Sessões de login persistidas no banco, para que qualquer worker
+    # consiga restaurar o usuário logado (não depende de sticky session)
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS sessoes (
+        token TEXT PRIMARY KEY,
+        usuario_id INTEGER NOT NULL,
+        criado_em REAL NOT NULL,
+        FOREIGN KEY (usuario_id) REFERENCES usuarios(id)
+    )
+    """)
+
     # Criar ADMIN somente se não existir (usuário padrão: ADMIN / senha: 1234)
     c.execute("SELECT id FROM usuarios WHERE usuario = ?", ("ADMIN",))
     if not c.fetchone():
@@ -86,6 +128,12 @@ def init_db():
     conn.commit()
     conn.close()
 
+@st.cache_resource
+def init_db_once():
+    # cache_resource sobrevive aos reruns do script dentro do mesmo processo
+    init_db()
+    return True
+
 # ---------------------------
 # Autenticação
 # ---------------------------
@@ -112,6 +160,50 @@ def authenticate(usuario: str, senha: str) -> Optional[dict]:
             return {"id": uid, "usuario": uname, "is_admin": bool(is_admin)}
     return None
 
+# ---------------------------
+# Sessões (compartilhadas entre workers)
+# ---------------------------
+# O token vai na URL (?sid=), então fica em histórico e logs: a validade é
+# curta e renovada com o uso (criado_em = último uso), e o token é trocado a
+# cada restauração, valendo uma única vez.
+SESSION_TTL = 30 * 60  # segundos sem uso
+SESSION_TOUCH_INTERVAL = 60  # segundos entre renovações de criado_em
+
+def create_session(uid: int) -> str:
+    # Chamado só no login: aproveita para limpar sessões expiradas
+    # (abas fechadas sem logout)
+    safe_execute("DELETE FROM sessoes WHERE criado_em <= ?", (time.time() - SESSION_TTL,))
+    token = secrets.token_urlsafe(32)
+    safe_execute("INSERT INTO sessoes (token, usuario_id, criado_em) VALUES (?, ?, ?)",
+                 (token, uid, time.time()))
+    return token
+
+def restore_session(token: str) -> Optional[Tuple[dict, str]]:
+    rows = safe_execute("""
+        SELECT u.id, u.usuario, u.is_admin FROM sessoes s
+        JOIN usuarios u ON u.id = s.usuario_id
+        WHERE s.token = ? AND s.criado_em > ?
+    """, (token, time.time() - SESSION_TTL))
+    if not rows:
+        return None
+    uid, uname, is_admin = rows[0]
+    # Troca o token num único UPDATE: atômico entre workers (só um consegue
+    # usar o token antigo) e, se falhar, o token antigo continua válido
+    novo = secrets.token_urlsafe(32)
+    rows = safe_execute("""
+        UPDATE sessoes SET token=?, criado_em=?
+        WHERE token=? AND criado_em > ? RETURNING usuario_id
+    """, (novo, time.time(), token, time.time() - SESSION_TTL))
+    if not rows:
+        return None
+    return {"id": uid, "usuario": uname, "is_admin": bool(is_admin)}, novo
+
+def touch_session(token: str):
+    safe_execute("UPDATE sessoes SET criado_em=? WHERE token=?", (time.time(), token))
+
+def delete_session(token: str):
+    safe_execute("DELETE FROM sessoes WHERE token=?", (token,))
+
 # ---------------------------
 # Usuários CRUD
 # ---------------------------
@@ -130,8 +222,11 @@ def update_user(uid: int, usuario: str, is_admin: bool):
 def update_user_password(uid: int, nova_senha: str):
     senha_hash = bcrypt.hashpw(nova_senha.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
     safe_execute("UPDATE usuarios SET senha=? WHERE id=?", (senha_hash, uid))
+    # senha trocada: derruba os links de login (?sid=) que possam ter vazado
+    safe_execute("DELETE FROM sessoes WHERE usuario_id=?", (uid,))
 
 def delete_user(uid: int):
+    safe_execute("DELETE FROM sessoes WHERE usuario_id=?", (uid,))
     safe_execute("DELETE FROM usuarios WHERE id=?", (uid,))
 
 # ---------------------------
@@ -232,6 +327,9 @@ def ui_login():
             return
         if user:
             st.session_state.user = user
+            # token na URL: outro worker consegue restaurar a sessão pelo banco
+            st.query_params["sid"] = create_session(user["id"])
+            st.session_state.sid_touched = time.time()
             st.success(f"Bem-vindo, {user['usuario']}!")
             st.experimental_rerun()
         else:
@@ -624,15 +722,35 @@ def ui_consult_orders():
 # ---------------------------
 def main():
     st.set_page_config(page_title="Sistema OS", layout="wide")
-    init_db()
+    init_db_once()
 
     if "user" not in st.session_state:
         st.session_state.user = None
+        # Sessão pode ter sido criada em outro worker: restaurar pelo token
+        sid = st.query_params.get("sid")
+        try:
+            restored = restore_session(sid) if sid else None
+        except sqlite3.OperationalError:
+            # banco ocupado: mantém o sid na URL para tentar de novo
+            st.session_state.pop("user", None)
+            st.error("Banco de dados ocupado. Recarregue a página em instantes.")
+            return
+        if restored:
+            st.session_state.user, st.query_params["sid"] = restored
+            st.session_state.sid_touched = time.time()
+        elif sid:
+            del st.query_params["sid"]
 
     if not st.session_state.user:
         ui_login()
         return
 
+    # Mantém a sessão do banco viva enquanto o usuário usa o app
+    sid = st.query_params.get("sid")
+    if sid and time.time() - st.session_state.get("sid_touched", 0) > SESSION_TOUCH_INTERVAL:
+        touch_session(sid)
+        st.session_state.sid_touched = time.time()
+
     # Sidebar: main menu e submenu
     st.sidebar.title("Menu")
     main_menu = st.sidebar.selectbox("Principal", ["-- Selecione --", "CADASTRO", "ORDEM DE SERVIÇO", "SAIR"], index=0)
@@ -643,6 +761,10 @@ def main():
         submenu = st.sidebar.selectbox("Ordem de Serviço", ["-- Selecione --", "ABRIR OS", "CONSULTAR OS"], index=0)
     elif main_menu == "SAIR":
         if st.sidebar.button("Confirmar logout"):
+            sid = st.query_params.get("sid")
+            if sid:
+                delete_session(sid)
+                del st.query_params["sid"]
             st.session_state.user = None
             st.experimental_rerun()
 
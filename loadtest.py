@@ -0,0 +1,125 @@
+# loadtest.py
+# Teste de carga local da CAMADA DE BANCO: mede a vazão de leitura das funções
+# do app.py com 1..N processos sobre o mesmo arquivo SQLite (WAL). Não passa
+# pelo Streamlit/HTTP; serve para mostrar que o banco não é o gargalo ao
+# subir vários workers com run_workers.py.
+#
+# Cada nº de workers roda um aquecimento descartado e depois --rounds rodadas,
+# cada uma num banco recém-criado; a tabela mostra a mediana e a dispersão
+# (mín–máx). Em máquinas com poucas CPUs a escala fica limitada ao nº de CPUs.
+#
+# Uso: python loadtest.py --max-workers 4 --seconds 5 --rounds 5 [--with-writer]
+import argparse
+import multiprocessing as mp
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+
+def _reader(db, seconds, out):
+    os.environ["SISTEMA_OS_DB"] = db
+    import app
+    n = 0
+    fim = time.time() + seconds
+    while time.time() < fim:
+        app.list_orders()
+        app.list_companies()
+        n += 1
+    out.put(n)
+
+
+def _writer(db, seconds, out):
+    os.environ["SISTEMA_OS_DB"] = db
+    import app
+    n = 0
+    fim = time.time() + seconds
+    while time.time() < fim:
+        app.create_service_type(f"carga-{os.getpid()}-{n}")
+        n += 1
+    out.put(n)
+
+
+def _seed(db):
+    os.environ["SISTEMA_OS_DB"] = db
+    import app
+    app.init_db()
+    app.create_service_type("Manutenção")
+    tipo_id = app.list_service_types()[0][0]
+    for i in range(50):
+        app.create_company(f"Empresa {i}", "", "", "", "", "", "", "")
+    for emp_id, _ in app.list_companies():
+        app.create_order(emp_id, "OS", "carga", tipo_id)
+
+
+def _seed_fresh(tmp, nome):
+    # Cada medição começa do mesmo conjunto de dados; o seed roda em outro
+    # processo para não deixar o módulo app carregado aqui com outro DB.
+    db = os.path.join(tmp, f"{nome}.db")
+    p = mp.Process(target=_seed, args=(db,))
+    p.start()
+    p.join()
+    if p.exitcode != 0:
+        raise SystemExit(f"seed terminou com código {p.exitcode}")
+    return db
+
+
+def run(db, workers, seconds, with_writer):
+    out = mp.Queue()
+    wout = mp.Queue()
+    procs = [mp.Process(target=_reader, args=(db, seconds, out)) for _ in range(workers)]
+    if with_writer:
+        procs.append(mp.Process(target=_writer, args=(db, seconds, wout)))
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+        if p.exitcode != 0:
+            raise SystemExit(f"processo {p.pid} terminou com código {p.exitcode}")
+    leituras = sum(out.get() for _ in range(workers))
+    escritas = wout.get() if with_writer else None
+    return leituras / seconds, (escritas / seconds if with_writer else None)
+
+
+def main():
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Teste de carga multi-processo do banco.")
+    parser.add_argument("--max-workers", type=int, default=None,
+                        help="padrão: nº de CPUs (menos 1 com --with-writer)")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--rounds", type=int, default=5,
+                        help="rodadas medidas por nº de workers (após 1 aquecimento)")
+    parser.add_argument("--with-writer", action="store_true",
+                        help="roda um processo de escrita junto, reportado à parte")
+    args = parser.parse_args()
+
+    max_workers = args.max_workers or max(1, cpus - (1 if args.with_writer else 0))
+    total = max_workers + (1 if args.with_writer else 0)
+    if total > cpus:
+        print(f"aviso: {total} processos para {cpus} CPU(s); a partir daí os processos "
+              f"disputam CPU e a coluna 'escala' deixa de medir o banco", file=sys.stderr)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        base = None
+        print(f"{'workers':>7} {'leituras/s (mediana)':>20} {'mín–máx':>13} {'escala':>7}"
+              + (f" {'escritas/s':>11}" if args.with_writer else ""))
+        for w in range(1, max_workers + 1):
+            # aquecimento: carrega módulos e cache de disco, resultado descartado
+            run(_seed_fresh(tmp, f"loadtest-{w}-warmup"), w, min(1.0, args.seconds),
+                args.with_writer)
+            amostras = [run(_seed_fresh(tmp, f"loadtest-{w}-{r}"), w, args.seconds,
+                            args.with_writer)
+                        for r in range(args.rounds)]
+            leituras = [rps for rps, _ in amostras]
+            rps = statistics.median(leituras)
+            base = base or rps
+            faixa = f"{min(leituras):.0f}–{max(leituras):.0f}"
+            linha = f"{w:>7} {rps:>20.0f} {faixa:>13} {rps / base:>6.2f}x"
+            if args.with_writer:
+                linha += f" {statistics.median(wps for _, wps in amostras):>11.0f}"
+            print(linha)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# run_workers.py
+# Sobe N processos do Streamlit (um por porta) usando o mesmo banco SQLite.
+# Coloque um balanceador local (nginx, haproxy, caddy) na frente das portas.
+#
+# Uso: python run_workers.py --workers 4 --base-port 8501
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(BASE_DIR, "app.py")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inicia vários workers do Sistema OS.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--base-port", type=int, default=8501)
+    parser.add_argument("--address", default="127.0.0.1")
+    args = parser.parse_args()
+
+    # Caminho absoluto do banco: todos os workers abrem o mesmo arquivo,
+    # independente de onde o launcher foi chamado
+    db = os.environ.get("SISTEMA_OS_DB", os.path.join(BASE_DIR, "sistema_os.db"))
+    os.environ["SISTEMA_OS_DB"] = os.path.abspath(db)
+    from app import init_db
+
+    # Cria as tabelas e ativa o WAL antes de os workers concorrerem pelo banco
+    init_db()
+
+    procs = []
+    for i in range(args.workers):
+        port = args.base_port + i
+        cmd = [
+            sys.executable, "-m", "streamlit", "run", APP_PATH,
+            "--server.port", str(port),
+            "--server.address", args.address,
+            "--server.headless", "true",
+            "--server.enableCORS", "false",
+            "--server.enableXsrfProtection", "false",
+        ]
+        procs.append(subprocess.Popen(cmd, cwd=BASE_DIR))
+        print(f"worker {i} -> http://{args.address}:{port}")
+
+    def stop(status=0):
+        for p in procs:
+            if p.poll() is None:
+                p.terminate()
+        for p in procs:
+            try:
+                p.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                p.kill()
+        sys.exit(status)
+
+    signal.signal(signal.SIGINT, lambda *_: stop(0))
+    signal.signal(signal.SIGTERM, lambda *_: stop(0))
+
+    # Se algum worker cair, encerra todos com código de erro para que o
+    # supervisor externo (systemd Restart=on-failure etc.) reinicie
+    while True:
+        mortos = [p for p in procs if p.poll() is not None]
+        if mortos:
+            code = mortos[0].returncode
+            print(f"worker pid {mortos[0].pid} terminou com código {code}", file=sys.stderr)
+            stop(code if code > 0 else 1)
+        time.sleep(1)
+
+
+if __name__ == "__main__":
+    main()